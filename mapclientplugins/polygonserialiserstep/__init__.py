@@ -23,5 +23,11 @@ __author__ = 'Ju Zhang'
 __stepname__ = 'Polygon Serialiser'
 __location__ = 'https://github.com/mapclient-plugins/polygonserialiserstep/archive/v1.0.0.zip'
 
-# import class that derives itself from the step mountpoint.
-from mapclientplugins.polygonserialiserstep import step
+import sys
+
+# import class that derives itself from the step mountpoint. This is only
+# done once MAP Client has imported the workflow step mountpoint, as its
+# plugin loader does before loading plugins, so that the command line
+# converter does not import Qt. See Plugin Loading in the README.
+if 'mapclient.mountpoints.workflowstep' in sys.modules:
+    from mapclientplugins.polygonserialiserstep import step
@@ -0,0 +1,191 @@
+"""
+MAP Client, a program to generate detailed musculoskeletal models for OpenSim.
+    Copyright (C) 2012  University of Auckland
+
+This file is part of MAP Client. (http://launchpad.net/mapclient)
+
+    MAP Client is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    MAP Client is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with MAP Client.  If not, see <http://www.gnu.org/licenses/>..
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mapclientplugins.polygonserialiserstep import exporter
+
+VERTICES_SUFFIX = '_v.npy'
+FACES_SUFFIX = '_f.npy'
+
+
+def find_meshes(patterns):
+    """
+    Find meshes in a list of directories, files or glob patterns. A mesh is
+    either a .npz file containing v and f arrays, or a pair of .npy files
+    named <name>_v.npy and <name>_f.npy.
+
+    Returns:
+    meshes: list of (name, source) tuples where source is the .npz path or
+    a (vertices path, faces path) tuple
+    """
+    paths = []
+    for p in patterns:
+        if os.path.isdir(p):
+            paths += sorted(glob.glob(os.path.join(p, '*.npz')))
+            paths += sorted(glob.glob(os.path.join(p, '*' + VERTICES_SUFFIX)))
+        else:
+            paths += sorted(glob.glob(p))
+
+    meshes = []
+    seen = set()
+    for p in paths:
+        p = os.path.abspath(p)
+        if p in seen:
+            continue
+        seen.add(p)
+        if p.endswith('.npz'):
+            meshes.append((os.path.splitext(os.path.basename(p))[0], p))
+        elif p.endswith(VERTICES_SUFFIX):
+            name = os.path.basename(p)[:-len(VERTICES_SUFFIX)]
+            meshes.append((name, (p, p[:-len(VERTICES_SUFFIX)] + FACES_SUFFIX)))
+
+    return meshes
+
+
+def load_mesh(source):
+    """
+    Load vertex and face arrays from a .npz path or a (vertices path,
+    faces path) tuple.
+    """
+    if isinstance(source, tuple):
+        return np.load(source[0]), np.load(source[1])
+
+    with np.load(source) as data:
+        return data['v'], data['f']
+
+
+def _source_label(source):
+    return source[0] if isinstance(source, tuple) else source
+
+
+def output_filenames(filename, suffix, n_lods=0, pieces=0):
+    """
+    All files written when exporting a mesh to filename, including levels
+    of detail and, for pvtp, the pieces of each. pieces is an upper bound,
+    0 for one per CPU.
+    """
+    filenames = [filename] + [exporter.lod_filename(filename, i) for i in range(1, n_lods + 1)]
+    if suffix != 'pvtp':
+        return filenames
+
+    if pieces < 1:
+        pieces = os.cpu_count() or 1
+    return filenames + [exporter.piece_filename(f, i) for f in filenames for i in range(pieces)]
+
+
+def _convert(job):
+    source, filename, suffix, options = job
+    v, f = load_mesh(source)
+    exporter.export_polygon(v, f, suffix, filename, **options)
+    return len(v), len(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='polygonserialiser',
+        description='Convert numpy vertex and face arrays to polygon mesh files.'
+    )
+    parser.add_argument('inputs', nargs='+',
+                        help='directories, .npz files containing v and f arrays, or <name>_v.npy files with '
+                             'a matching <name>_f.npy. Glob patterns are expanded.')
+    parser.add_argument('-s', '--suffix', required=True, choices=exporter.supported_suffixes,
+                        help='output file format')
+    parser.add_argument('-o', '--output-dir',
+                        help='directory to write to, defaults to the directory of each input')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of processes, defaults to the number of CPUs')
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help='number of LOD levels and pvtp pieces written at once within each process, '
+                             'defaults to 1')
+    parser.add_argument('--reorder', action='store_true',
+                        help='reorder vertices and faces for locality before writing')
+    parser.add_argument('--lod', default='',
+                        help='comma separated target face counts of additional levels of detail')
+    parser.add_argument('--pieces', type=int, default=0,
+                        help='number of pieces for pvtp, 0 for one per CPU')
+    args = parser.parse_args(argv)
+
+    try:
+        lod_face_counts = exporter.parse_lod_face_counts(args.lod)
+    except ValueError:
+        parser.error('invalid LOD face counts: {}'.format(args.lod))
+
+    meshes = find_meshes(args.inputs)
+    if not meshes:
+        parser.error('no meshes found')
+
+    if args.output_dir is not None and not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    options = {
+        'reorder': args.reorder,
+        'lod_face_counts': lod_face_counts,
+        'pieces': args.pieces,
+        'threads': max(1, args.threads),
+    }
+    jobs = []
+    sources = {}
+    for name, source in meshes:
+        source_dir = os.path.dirname(source[0] if isinstance(source, tuple) else source)
+        out_dir = source_dir if args.output_dir is None else args.output_dir
+        filename = os.path.abspath(os.path.join(out_dir, name + '.' + args.suffix))
+        for out in output_filenames(filename, args.suffix, len(lod_face_counts), args.pieces):
+            if out in sources:
+                parser.error('{} and {} would both be written to {}'.format(
+                    _source_label(sources[out]), _source_label(source), out))
+            sources[out] = source
+        jobs.append((source, filename, args.suffix, options))
+
+    start = time.time()
+    n_meshes = 0
+    n_faces = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [(job, pool.submit(_convert, job)) for job in jobs]
+        for job, future in futures:
+            try:
+                _, nf = future.result()
+            except Exception as e:
+                print('failed to convert {}: {}'.format(_source_label(job[0]), e), file=sys.stderr)
+                failed += 1
+                continue
+            n_meshes += 1
+            n_faces += nf
+    elapsed = time.time() - start
+
+    print('converted {} meshes ({} faces) in {:.2f} s: {:.2f} meshes/s, {:.0f} faces/s'.format(
+        n_meshes, n_faces, elapsed, n_meshes / elapsed, n_faces / elapsed))
+    if failed:
+        print('{} meshes failed'.format(failed), file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -63,6 +63,7 @@ class ConfigureDialog(QtWidgets.QDialog):
         self._ui.idLineEdit.textChanged.connect(self.validate)
         self._ui.fileLocButton.clicked.connect(self._fileLocClicked)
         self._ui.fileLocLineEdit.textChanged.connect(self._fileLocEdited)
+        self._ui.lodLineEdit.textChanged.connect(self.validate)
 
     def accept(self):
         """
@@ -102,7 +103,14 @@ class ConfigureDialog(QtWidgets.QDialog):
         file_loc_valid = os.path.exists(os.path.dirname(output_location))
         self._ui.fileLocLineEdit.setStyleSheet(DEFAULT_STYLE_SHEET if file_loc_valid else INVALID_STYLE_SHEET)
 
-        valid = id_valid and file_loc_valid
+        try:
+            exporter.parse_lod_face_counts(self._ui.lodLineEdit.text())
+            lod_valid = True
+        except ValueError:
+            lod_valid = False
+        self._ui.lodLineEdit.setStyleSheet(DEFAULT_STYLE_SHEET if lod_valid else INVALID_STYLE_SHEET)
+
+        valid = id_valid and file_loc_valid and lod_valid
         self._ui.buttonBox.button(QtWidgets.QDialogButtonBox.StandardButton.Ok).setEnabled(id_valid)
 
         return valid
@@ -118,7 +126,10 @@ class ConfigureDialog(QtWidgets.QDialog):
         config = {
             'identifier': self._ui.idLineEdit.text(),
             'fileFormat': self._ui.fileFormatCombo.currentText(),
-            'fileLoc': self._ui.fileLocLineEdit.text()
+            'fileLoc': self._ui.fileLocLineEdit.text(),
+            'reorder': self._ui.reorderCheckBox.isChecked(),
+            'lodFaceCounts': self._ui.lodLineEdit.text(),
+            'pieces': self._ui.piecesSpinBox.value()
         }
         return config
 
@@ -137,6 +148,9 @@ class ConfigureDialog(QtWidgets.QDialog):
             )
         )
         self._ui.fileLocLineEdit.setText(config['fileLoc'])
+        self._ui.reorderCheckBox.setChecked(config['reorder'])
+        self._ui.lodLineEdit.setText(config['lodFaceCounts'])
+        self._ui.piecesSpinBox.setValue(config['pieces'])
 
     def _fileLocClicked(self):
         location = QtWidgets.QFileDialog.getSaveFileName(self, 'Select File Location', self._previousFileLoc)
@@ -18,15 +18,20 @@ This file is part of MAP Client. (http://launchpad.net/mapclient)
     along with MAP Client.  If not, see <http://www.gnu.org/licenses/>..
 """
 
+import os
 from os import path
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 from vtkmodules.vtkCommonCore import vtkPoints, VTK_VERSION
 from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolygon, vtkPolyData
-from vtkmodules.vtkRenderingCore import vtkPolyDataMapper, vtkActor, vtkRenderer, vtkRenderWindow
-from vtkmodules.vtkIOExport import vtkOBJExporter, vtkVRMLExporter
+from vtkmodules.vtkFiltersCore import vtkQuadricDecimation, vtkTriangleFilter
 from vtkmodules.vtkIOPLY import vtkPLYWriter
 from vtkmodules.vtkIOGeometry import vtkSTLWriter
 from vtkmodules.vtkIOLegacy import vtkPolyDataWriter
+from vtkmodules.vtkIOXML import vtkXMLPolyDataWriter
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
 
 
 def polygons2Polydata(vertices, faces):
@@ -65,6 +70,256 @@ def polygons2Polydata(vertices, faces):
     return P
 
 
+def arrays2Polydata(vertices, faces, dtype=np.float32):
+    """
+    Create a vtkPolyData instance from vertex and face arrays without
+    looping over them in python.
+
+    Inputs:
+    vertices: (nx3) array of vertex coordinates
+    faces: (mxk) array of vertex indices for each face
+    dtype: point coordinate type, float32 as in polygons2Polydata
+
+    Returns:
+    P: vtkPolyData instance
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=dtype)
+    faces = np.asarray(faces, dtype=np.int64)
+
+    points = vtkPoints()
+    points.SetData(numpy_to_vtk(vertices, deep=1))
+
+    # fill the cell array's own 64 bit storage, as InsertNextCell would,
+    # so that writers label the arrays the same as for polygons2Polydata
+    polygons = vtkCellArray()
+    polygons.Use64BitStorage()
+    offsets = polygons.GetOffsetsArray()
+    offsets.SetNumberOfValues(len(faces) + 1)
+    vtk_to_numpy(offsets)[:] = np.arange(0, faces.size + 1, max(faces.shape[1], 1))
+    connectivity = polygons.GetConnectivityArray()
+    connectivity.SetNumberOfValues(faces.size)
+    vtk_to_numpy(connectivity)[:] = faces.ravel()
+
+    P = vtkPolyData()
+    P.SetPoints(points)
+    P.SetPolys(polygons)
+
+    return P
+
+
+def polydata2Arrays(polydata):
+    """
+    Extract vertex and face arrays from a vtkPolyData instance whose
+    polygons all have the same number of vertices.
+
+    Returns:
+    vertices: (nx3) array of vertex coordinates
+    faces: (mxk) array of vertex indices for each face
+    """
+    vertices = vtk_to_numpy(polydata.GetPoints().GetData()).astype(np.float64)
+    polys = polydata.GetPolys()
+    sizes = np.diff(vtk_to_numpy(polys.GetOffsetsArray()))
+    if len(sizes) == 0:
+        return vertices, np.zeros((0, 3), dtype=np.int64)
+    if (sizes != sizes[0]).any():
+        raise ValueError('polydata faces must all have the same number of vertices')
+    faces = vtk_to_numpy(polys.GetConnectivityArray()).astype(np.int64).reshape(-1, sizes[0])
+    return vertices, faces
+
+
+def _part1by2(x):
+    """
+    Spread the lower 21 bits of each integer in x so that there are two zero
+    bits between each of them.
+    """
+    x = x.astype(np.uint64) & np.uint64(0x1fffff)
+    x = (x | (x << np.uint64(32))) & np.uint64(0x1f00000000ffff)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x1f0000ff0000ff)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x100f00f00f00f00f)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x10c30c30c30c30c3)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return x
+
+
+def morton_codes(points):
+    """
+    Calculate the 63-bit Morton (Z-order) code of each point.
+
+    Inputs:
+    points: (nx3) array of coordinates
+
+    Returns:
+    codes: (n,) uint64 array of Morton codes
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    pmin = points.min(0)
+    extent = (points.max(0) - pmin).max()
+    if extent == 0:
+        extent = 1.0
+    q = ((points - pmin) * ((2 ** 21 - 1) / extent)).astype(np.uint64)
+    return (_part1by2(q[:, 0]) |
+            (_part1by2(q[:, 1]) << np.uint64(1)) |
+            (_part1by2(q[:, 2]) << np.uint64(2)))
+
+
+def reorder_mesh(vertices, faces):
+    """
+    Reorder vertices and faces for locality. Vertices are first sorted along
+    a Morton curve, faces are then sorted by their lowest vertex index, and
+    vertices are finally renumbered in the order they are first referenced by
+    the sorted faces so that consecutive faces reuse recently seen vertices.
+    Vertices not referenced by any face are kept at the end.
+
+    Inputs:
+    vertices: (nx3) array of vertex coordinates
+    faces: (mxk) array of vertex indices for each face
+
+    Returns:
+    vertices: (nx3) array of reordered vertex coordinates
+    faces: (mxk) array of reordered and remapped faces
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    n = len(vertices)
+
+    # space-filling curve order of vertices
+    order = np.argsort(morton_codes(vertices), kind='stable')
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    faces = rank[faces]
+
+    # sort faces by sorted vertex indices, lowest first
+    sfaces = np.sort(faces, axis=1)
+    forder = np.lexsort(sfaces.T[::-1])
+    faces = faces[forder]
+
+    # renumber vertices by first reference
+    flat = faces.ravel()
+    referenced, first = np.unique(flat, return_index=True)
+    by_first = referenced[np.argsort(first, kind='stable')]
+    unreferenced = np.setdiff1d(np.arange(n), referenced, assume_unique=True)
+    order2 = np.concatenate([by_first, unreferenced])
+    rank2 = np.empty(n, dtype=np.int64)
+    rank2[order2] = np.arange(n)
+
+    return vertices[order][order2], rank2[faces]
+
+
+def _compressed_size(vertices, faces):
+    v = np.ascontiguousarray(vertices)
+    f = np.ascontiguousarray(faces)
+    return len(zlib.compress(v.tobytes())) + len(zlib.compress(f.tobytes()))
+
+
+def _max_workers(n_tasks, threads=None):
+    if threads is None:
+        threads = os.cpu_count() or 1
+    return max(1, min(n_tasks, threads))
+
+
+def partition_faces(vertices, faces, n_pieces):
+    """
+    Split faces into n_pieces spatially compact groups of similar size by
+    sorting face centroids along a Morton curve.
+
+    Returns:
+    pieces: list of arrays of face indices
+    """
+    centroids = vertices[faces].mean(1)
+    order = np.argsort(morton_codes(centroids), kind='stable')
+    return np.array_split(order, n_pieces)
+
+
+def piece_filename(filename, piece):
+    """
+    Filename of a piece of a partitioned mesh, e.g. mesh.pvtp -> mesh_0.vtp.
+    """
+    return '{}_{}.vtp'.format(path.splitext(filename)[0], piece)
+
+
+def _write_piece(vertices, faces, face_inds, filename, ascenc):
+    piece_faces = faces[face_inds]
+    global_ids, local_faces = np.unique(piece_faces, return_inverse=True)
+    # points are written as Float64, as declared in the pvtp index
+    P = arrays2Polydata(vertices[global_ids], local_faces.reshape(piece_faces.shape), dtype=np.float64)
+
+    # shared boundary vertices are duplicated across pieces, keep their
+    # index in the whole mesh so that pieces can be merged consistently
+    ids = numpy_to_vtk(global_ids.astype(np.int64), deep=1)
+    ids.SetName('GlobalPointIds')
+    P.GetPointData().SetGlobalIds(ids)
+
+    w = vtkXMLPolyDataWriter()
+    w.SetInputDataObject(P)
+    w.SetFileName(filename)
+    if ascenc:
+        w.SetDataModeToAscii()
+    else:
+        w.SetDataModeToBinary()
+    w.Write()
+
+
+def _write_pvtp_index(filename, piece_filenames):
+    lines = [
+        '<?xml version="1.0"?>',
+        '<VTKFile type="PPolyData" version="0.1" byte_order="LittleEndian">',
+        '  <PPolyData GhostLevel="0">',
+        '    <PPointData GlobalIds="GlobalPointIds">',
+        '      <PDataArray type="Int64" Name="GlobalPointIds"/>',
+        '    </PPointData>',
+        '    <PPoints>',
+        '      <PDataArray type="Float64" Name="Points" NumberOfComponents="3"/>',
+        '    </PPoints>',
+    ]
+    for pf in piece_filenames:
+        lines.append('    <Piece Source="{}"/>'.format(path.basename(pf)))
+    lines += [
+        '  </PPolyData>',
+        '</VTKFile>',
+    ]
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def write_partitioned(vertices, faces, filename, pieces=0, ascenc=True, threads=None):
+    """
+    Split a mesh into spatial pieces, write each piece concurrently to its
+    own .vtp file and write a .pvtp file indexing the pieces. Pieces left
+    by a previous export of the same file with more pieces are removed.
+
+    Inputs:
+    vertices: (nx3) array of vertex coordinates
+    faces: (mxk) array of vertex indices for each face
+    filename: path of the .pvtp file
+    pieces: number of pieces, 0 for one per CPU
+    ascenc: boolean, write pieces in ascii (True) or binary (False)
+    threads: maximum number of pieces written at once, None for one per CPU
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    if pieces < 1:
+        pieces = os.cpu_count() or 1
+    pieces = max(1, min(pieces, len(faces)))
+
+    piece_faces = partition_faces(vertices, faces, pieces)
+    piece_filenames = [piece_filename(filename, i) for i in range(pieces)]
+
+    stale = pieces
+    while path.exists(piece_filename(filename, stale)):
+        os.remove(piece_filename(filename, stale))
+        stale += 1
+
+    with ThreadPoolExecutor(max_workers=_max_workers(pieces, threads)) as pool:
+        futures = [pool.submit(_write_piece, vertices, faces, fi, pf, ascenc)
+                   for fi, pf in zip(piece_faces, piece_filenames)]
+        for future in futures:
+            future.result()
+
+    _write_pvtp_index(filename, piece_filenames)
+
+
 class Writer(object):
     """Class for writing polygons to file formats supported by VTK.
     """
@@ -78,6 +333,11 @@ class Writer(object):
         rw: vtkRenderWindow instance
         colour: 3-tuple of colour (only works for ply)
         ascii: boolean, write in ascii (True) or binary (False)
+        reorder: boolean, reorder v and f for locality before writing,
+            requires v and f
+        pieces: number of pieces for pvtp, 0 for one per CPU
+        threads: maximum number of pvtp pieces written at once, None for
+            one per CPU
         """
         self.filename = kwargs.get('filename')
         if self.filename is not None:
@@ -89,8 +349,18 @@ class Writer(object):
         self._colour = kwargs.get('colour')
         # self._field_data = kwargs.get('field')
         self._write_ascii = kwargs.get('ascii')
+        self._reorder = kwargs.get('reorder', False)
+        if self._reorder and self._vertices is None:
+            raise ValueError('reorder requires v and f arrays')
+        self._pieces = kwargs.get('pieces', 0)
+        self._threads = kwargs.get('threads')
         self._isoldvtk = int(VTK_VERSION.split('.')[0]) < 6
 
+    def getPolydata(self):
+        if self._polydata is None:
+            self._make_polydata()
+        return self._polydata
+
     def setFilename(self, f):
         self.filename = f
         self._parse_format()
@@ -99,10 +369,27 @@ class Writer(object):
         self.file_prefix, self.file_ext = path.splitext(self.filename)
         self.file_ext = self.file_ext.lower()
 
+    def _reorder_arrays(self):
+        if self._reorder:
+            size_before = _compressed_size(self._vertices, self._faces)
+            self._vertices, self._faces = reorder_mesh(self._vertices, self._faces)
+            size_after = _compressed_size(self._vertices, self._faces)
+            print('reordering changed compressed mesh size from {} to {} bytes ({:.1f}%)'.format(
+                size_before, size_after, 100.0 * (size_after - size_before) / size_before))
+            self._reorder = False
+
     def _make_polydata(self):
-        self._polydata = polygons2Polydata(self._vertices, self._faces)
+        self._reorder_arrays()
+        if isinstance(self._faces, np.ndarray) and self._faces.ndim == 2:
+            self._polydata = arrays2Polydata(self._vertices, self._faces)
+        else:
+            self._polydata = polygons2Polydata(self._vertices, self._faces)
 
     def _make_render_window(self):
+        # rendering modules are only imported when needed so that the
+        # exporter can be used headless
+        from vtkmodules.vtkRenderingCore import vtkPolyDataMapper, vtkActor, vtkRenderer, vtkRenderWindow
+
         if self._polydata is None:
             self._make_polydata()
         ply_mapper = vtkPolyDataMapper()
@@ -134,6 +421,8 @@ class Writer(object):
             self.write_ply(ascenc=ascenc)
         elif fileExt == '.vtp':
             self.write_vtp(ascenc=ascenc)
+        elif fileExt == '.pvtp':
+            self.write_pvtp(ascenc=ascenc)
         else:
             raise ValueError('unknown file extension')
 
@@ -143,6 +432,7 @@ class Writer(object):
         if self._render_window is None:
             self._make_render_window()
 
+        from vtkmodules.vtkIOExport import vtkOBJExporter
         w = vtkOBJExporter()
         w.SetRenderWindow(self._render_window)
         w.SetFilePrefix(path.splitext(self.filename)[0])
@@ -193,6 +483,7 @@ class Writer(object):
         if self._render_window is None:
             self._make_render_window()
 
+        from vtkmodules.vtkIOExport import vtkVRMLExporter
         w = vtkVRMLExporter()
         w.SetRenderWindow(self._render_window)
         w.SetFileName(self.filename)
@@ -216,11 +507,141 @@ class Writer(object):
             w.SetFileTypeToBinary()
         w.Write()
 
+    def write_pvtp(self, filename=None, ascenc=True):
+        if filename is not None:
+            self.filename = filename
+        if self._vertices is None:
+            self._vertices, self._faces = polydata2Arrays(self._polydata)
+        self._reorder_arrays()
+
+        write_partitioned(self._vertices, self._faces, self.filename,
+                          pieces=self._pieces, ascenc=ascenc, threads=self._threads)
+
+
+supported_suffixes = ('stl', 'wrl', 'obj', 'ply', 'vtp', 'pvtp')
+
+# formats written through a vtkRenderWindow, which must stay on the main thread
+_render_suffixes = ('obj', 'wrl')
+
+
+def _write_suffix(w, suffix, filename):
+    if suffix == 'obj':
+        w.write_obj(filename)
+    elif suffix == 'wrl':
+        w.write_vrml(filename)
+    elif suffix == 'stl':
+        w.write_stl(filename)
+    elif suffix == 'ply':
+        w.write_ply(filename)
+    elif suffix == 'vtp':
+        w.write_vtp(filename)
+    elif suffix == 'pvtp':
+        w.write_pvtp(filename)
+
+
+def parse_lod_face_counts(text):
+    """
+    Parse a comma separated string of target face counts for level of
+    detail export, e.g. '20000, 5000'.
+
+    Returns:
+    counts: list of positive ints in decreasing order
+    """
+    counts = []
+    for c in text.split(','):
+        c = c.strip()
+        if not c:
+            continue
+        n = int(c)
+        if n < 1:
+            raise ValueError('LOD face counts must be positive')
+        counts.append(n)
+    return sorted(set(counts), reverse=True)
+
+
+def lod_filename(filename, level):
+    """
+    Filename for a level of detail, e.g. mesh.stl -> mesh_lod1.stl.
+    """
+    f_prefix, f_ext = path.splitext(filename)
+    return '{}_lod{}{}'.format(f_prefix, level, f_ext)
+
 
-supported_suffixes = ('stl', 'wrl', 'obj', 'ply', 'vtp')
+def decimate_polydata(polydata, target_faces):
+    """
+    Decimate a triangulated vtkPolyData to approximately target_faces
+    triangles using quadric decimation. The input is returned unchanged if
+    it already has no more than target_faces triangles.
+    """
+    n_faces = polydata.GetNumberOfPolys()
+    if target_faces >= n_faces:
+        return polydata
+
+    # ShallowCopy shares the point and cell arrays with the input. They are
+    # only read, vtkQuadricDecimation deep copies them into its own mesh.
+    # The separate vtkPolyData keeps each decimation's pipeline information
+    # off the shared input so that levels can be decimated concurrently.
+    P = vtkPolyData()
+    P.ShallowCopy(polydata)
 
+    d = vtkQuadricDecimation()
+    d.SetInputDataObject(P)
+    d.SetTargetReduction(1.0 - float(target_faces) / n_faces)
+    d.Update()
+    return d.GetOutput()
 
-def export_polygon(v, f, suffix, filename):
+
+def export_lods(polydata, suffix, filename, face_counts, pieces=0, threads=None):
+    """
+    Decimate polydata to each target face count in face_counts and write
+    each level concurrently to filename with an _lod<n> suffix, with level
+    1 being the finest. pieces is the number of pieces of each level when
+    writing pvtp. threads is the total number of threads shared between the
+    levels and their pieces, None for one per CPU. Face counts are compared
+    against the triangulated mesh, counts at or above its number of
+    triangles are skipped.
+    """
+    tri = vtkTriangleFilter()
+    tri.SetInputDataObject(polydata)
+    tri.Update()
+    triangles = tri.GetOutput()
+
+    n_faces = triangles.GetNumberOfPolys()
+    counts = []
+    for c in sorted(face_counts, reverse=True):
+        if c >= n_faces:
+            print('skipping LOD with {} faces, mesh only has {} triangles'.format(c, n_faces))
+        else:
+            counts.append(c)
+    if not counts:
+        return
+
+    levels = list(enumerate(counts, 1))
+    if threads is None:
+        threads = os.cpu_count() or 1
+    level_workers = _max_workers(len(levels), threads)
+    # split the threads between concurrent levels so that each level's
+    # pieces do not start a pool of their own per CPU
+    piece_threads = max(1, threads // level_workers)
+
+    def _export_level(level, target_faces):
+        lod = decimate_polydata(triangles, target_faces)
+        lod_w = Writer(polydata=lod, pieces=pieces, threads=piece_threads)
+        lod_f = lod_filename(filename, level)
+        print('writing LOD {} with {} faces to {}'.format(level, lod.GetNumberOfPolys(), lod_f))
+        if suffix not in _render_suffixes:
+            _write_suffix(lod_w, suffix, lod_f)
+        return lod_w, lod_f
+
+    with ThreadPoolExecutor(max_workers=level_workers) as pool:
+        results = list(pool.map(lambda l: _export_level(*l), levels))
+
+    if suffix in _render_suffixes:
+        for lod_w, lod_f in results:
+            _write_suffix(lod_w, suffix, lod_f)
+
+
+def export_polygon(v, f, suffix, filename, reorder=False, lod_face_counts=None, pieces=0, threads=None):
     if len(v.shape) != 2:
         raise ValueError('v array must be of shape [n, 3]')
     if v.shape[1] != 3:
@@ -230,7 +651,7 @@ def export_polygon(v, f, suffix, filename):
     if suffix not in supported_suffixes:
         raise ValueError('Unsupported suffix {}'.format(suffix))
 
-    w = Writer(v=v, f=f)
+    w = Writer(v=v, f=f, reorder=reorder, pieces=pieces, threads=threads)
     f_prefix, f_ext = path.splitext(filename)
     if f_ext == '':
         filename = f_prefix + '.' + suffix
@@ -240,13 +661,7 @@ def export_polygon(v, f, suffix, filename):
     print('writing {} vertices and {} faces to {}'.format(len(v), len(f), filename))
     print('suffix: {}'.format(suffix))
 
-    if suffix == 'obj':
-        w.write_obj(filename)
-    elif suffix == 'wrl':
-        w.write_vrml(filename)
-    elif suffix == 'stl':
-        w.write_stl(filename)
-    elif suffix == 'ply':
-        w.write_ply(filename)
-    elif suffix == 'vtp':
-        w.write_vtp(filename)
+    _write_suffix(w, suffix, filename)
+
+    if lod_face_counts:
+        export_lods(w.getPolydata(), suffix, filename, lod_face_counts, pieces=pieces, threads=threads)
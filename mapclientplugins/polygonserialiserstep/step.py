@@ -50,7 +50,10 @@ class PolygonSerialiserStep(WorkflowStepMountPoint):
         self._config = {
             'identifier': '',
             'fileFormat': 'stl',
-            'fileLoc': ''
+            'fileLoc': '',
+            'reorder': False,
+            'lodFaceCounts': '',
+            'pieces': 0
         }
         # self._config['formatOptions'] = None
 
@@ -67,11 +70,17 @@ class PolygonSerialiserStep(WorkflowStepMountPoint):
         # Put your execute step code here before calling the '_doneExecution' method.
         if self._fileLoc is None:
             exporter.export_polygon(self._vertices, self._faces,
-                                    self._config['fileFormat'], os.path.join(self._location, self._config['fileLoc'])
+                                    self._config['fileFormat'], os.path.join(self._location, self._config['fileLoc']),
+                                    reorder=self._config['reorder'],
+                                    lod_face_counts=exporter.parse_lod_face_counts(self._config['lodFaceCounts']),
+                                    pieces=self._config['pieces']
                                     )
         else:
             exporter.export_polygon(self._vertices, self._faces,
                                     self._config['fileFormat'], os.path.join(self._location, self._fileLoc),
+                                    reorder=self._config['reorder'],
+                                    lod_face_counts=exporter.parse_lod_face_counts(self._config['lodFaceCounts']),
+                                    pieces=self._config['pieces']
                                     )
         self._doneExecution()
 
@@ -15,10 +15,11 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
-from PySide6.QtWidgets import (QAbstractButton, QApplication, QComboBox, QDialog,
+from PySide6.QtWidgets import (QAbstractButton, QApplication, QCheckBox, QComboBox,
+    QDialog,
     QDialogButtonBox, QFormLayout, QGridLayout, QGroupBox,
     QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QSizePolicy, QWidget)
+    QSizePolicy, QSpinBox, QWidget)
 
 class Ui_Dialog(object):
     def setupUi(self, Dialog):
@@ -72,6 +73,37 @@ class Ui_Dialog(object):
 
         self.formLayout.setLayout(2, QFormLayout.FieldRole, self.horizontalLayout)
 
+        self.reorderLabel = QLabel(self.configGroupBox)
+        self.reorderLabel.setObjectName(u"reorderLabel")
+
+        self.formLayout.setWidget(3, QFormLayout.LabelRole, self.reorderLabel)
+
+        self.reorderCheckBox = QCheckBox(self.configGroupBox)
+        self.reorderCheckBox.setObjectName(u"reorderCheckBox")
+
+        self.formLayout.setWidget(3, QFormLayout.FieldRole, self.reorderCheckBox)
+
+        self.lodLabel = QLabel(self.configGroupBox)
+        self.lodLabel.setObjectName(u"lodLabel")
+
+        self.formLayout.setWidget(4, QFormLayout.LabelRole, self.lodLabel)
+
+        self.lodLineEdit = QLineEdit(self.configGroupBox)
+        self.lodLineEdit.setObjectName(u"lodLineEdit")
+
+        self.formLayout.setWidget(4, QFormLayout.FieldRole, self.lodLineEdit)
+
+        self.piecesLabel = QLabel(self.configGroupBox)
+        self.piecesLabel.setObjectName(u"piecesLabel")
+
+        self.formLayout.setWidget(5, QFormLayout.LabelRole, self.piecesLabel)
+
+        self.piecesSpinBox = QSpinBox(self.configGroupBox)
+        self.piecesSpinBox.setObjectName(u"piecesSpinBox")
+        self.piecesSpinBox.setMaximum(4096)
+
+        self.formLayout.setWidget(5, QFormLayout.FieldRole, self.piecesSpinBox)
+
 
         self.gridLayout.addWidget(self.configGroupBox, 0, 0, 1, 1)
 
@@ -85,7 +117,10 @@ class Ui_Dialog(object):
         QWidget.setTabOrder(self.idLineEdit, self.fileFormatCombo)
         QWidget.setTabOrder(self.fileFormatCombo, self.fileLocLineEdit)
         QWidget.setTabOrder(self.fileLocLineEdit, self.fileLocButton)
-        QWidget.setTabOrder(self.fileLocButton, self.buttonBox)
+        QWidget.setTabOrder(self.fileLocButton, self.reorderCheckBox)
+        QWidget.setTabOrder(self.reorderCheckBox, self.lodLineEdit)
+        QWidget.setTabOrder(self.lodLineEdit, self.piecesSpinBox)
+        QWidget.setTabOrder(self.piecesSpinBox, self.buttonBox)
 
         self.retranslateUi(Dialog)
         self.buttonBox.accepted.connect(Dialog.accept)
@@ -101,5 +136,18 @@ class Ui_Dialog(object):
         self.fileFormatLabel.setText(QCoreApplication.translate("Dialog", u"File Format:", None))
         self.fileLocLabel.setText(QCoreApplication.translate("Dialog", u"Filename:", None))
         self.fileLocButton.setText(QCoreApplication.translate("Dialog", u"...", None))
+        self.reorderLabel.setText(QCoreApplication.translate("Dialog", u"Reorder Mesh:", None))
+#if QT_CONFIG(tooltip)
+        self.reorderCheckBox.setToolTip(QCoreApplication.translate("Dialog", u"Sort vertices and faces for locality before writing", None))
+#endif // QT_CONFIG(tooltip)
+        self.reorderCheckBox.setText("")
+        self.lodLabel.setText(QCoreApplication.translate("Dialog", u"LOD Face Counts:", None))
+#if QT_CONFIG(tooltip)
+        self.lodLineEdit.setToolTip(QCoreApplication.translate("Dialog", u"Comma separated target face counts of additional decimated levels of detail", None))
+#endif // QT_CONFIG(tooltip)
+        self.piecesLabel.setText(QCoreApplication.translate("Dialog", u"Pieces:", None))
+#if QT_CONFIG(tooltip)
+        self.piecesSpinBox.setToolTip(QCoreApplication.translate("Dialog", u"Number of pieces written in parallel for pvtp, 0 for one per CPU", None))
+#endif // QT_CONFIG(tooltip)
     # retranslateUi
 
@@ -32,4 +32,9 @@ setup(name=u'mapclientplugins.polygonserialiserstep',
     include_package_data=True,
     zip_safe=False,
     install_requires=requires,
+    entry_points={
+        'console_scripts': [
+            'polygonserialiser = mapclientplugins.polygonserialiserstep.cli:main',
+        ],
+    },
     )
@@ -0,0 +1,81 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from mapclientplugins.polygonserialiserstep import cli
+
+V = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=float)
+F = np.array([[0, 1, 2], [1, 3, 2]])
+
+
+class CLITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _path(self, *p):
+        return os.path.join(self._dir, *p)
+
+    def test_does_not_import_qt(self):
+        # run in a fresh interpreter so that modules imported by other tests
+        # do not hide or cause failures
+        code = ('import sys\n'
+                'import mapclientplugins.polygonserialiserstep.cli\n'
+                'assert "mapclientplugins.polygonserialiserstep.step" not in sys.modules\n'
+                'assert not [m for m in sys.modules if m.startswith("PySide")]\n'
+                'assert "vtkmodules.vtkRenderingCore" not in sys.modules\n')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_find_meshes(self):
+        np.savez(self._path('a.npz'), v=V, f=F)
+        np.save(self._path('b_v.npy'), V)
+        np.save(self._path('b_f.npy'), F)
+
+        meshes = cli.find_meshes([self._dir, self._path('*.npz')])
+        self.assertEqual(meshes, [
+            ('a', self._path('a.npz')),
+            ('b', (self._path('b_v.npy'), self._path('b_f.npy'))),
+        ])
+        for _, source in meshes:
+            v, f = cli.load_mesh(source)
+            self.assertTrue(np.array_equal(v, V))
+            self.assertTrue(np.array_equal(f, F))
+
+    def test_convert(self):
+        np.savez(self._path('a.npz'), v=V, f=F)
+        np.savez(self._path('b.npz'), v=V, f=F)
+        self.assertEqual(cli.main(['-s', 'vtp', '-j', '2', '-o', self._path('out'), self._dir]), 0)
+        self.assertEqual(sorted(os.listdir(self._path('out'))), ['a.vtp', 'b.vtp'])
+
+    def test_output_collision(self):
+        np.savez(self._path('a.npz'), v=V, f=F)
+        np.save(self._path('a_v.npy'), V)
+        np.save(self._path('a_f.npy'), F)
+        with self.assertRaises(SystemExit):
+            cli.main(['-s', 'stl', self._dir])
+        self.assertFalse(os.path.exists(self._path('a.stl')))
+
+    def test_lod_output_collision(self):
+        np.savez(self._path('m.npz'), v=V, f=F)
+        np.savez(self._path('m_lod1.npz'), v=V, f=F)
+        self.assertEqual(cli.main(['-s', 'stl', '-j', '1', self._dir]), 0)
+        with self.assertRaises(SystemExit):
+            cli.main(['-s', 'stl', '--lod', '1', self._dir])
+
+    def test_output_filenames(self):
+        self.assertEqual(cli.output_filenames('m.stl', 'stl', 1), ['m.stl', 'm_lod1.stl'])
+        self.assertEqual(cli.output_filenames('m.pvtp', 'pvtp', 1, 2),
+                         ['m.pvtp', 'm_lod1.pvtp', 'm_0.vtp', 'm_1.vtp', 'm_lod1_0.vtp', 'm_lod1_1.vtp'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from vtkmodules.vtkIOXML import vtkXMLPPolyDataReader
+from vtkmodules.util.numpy_support import vtk_to_numpy
+
+from mapclientplugins.polygonserialiserstep import exporter
+
+
+def _grid_mesh(n=10, seed=0):
+    """Triangulated n x n grid with shuffled vertex and face order.
+    """
+    x, y = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+    v = np.stack([x.ravel(), y.ravel(), np.sin(x.ravel() + y.ravel())], 1).astype(float)
+    i = np.arange(n * n).reshape(n, n)
+    a, b, c, d = i[:-1, :-1].ravel(), i[1:, :-1].ravel(), i[1:, 1:].ravel(), i[:-1, 1:].ravel()
+    f = np.concatenate([np.stack([a, b, c], 1), np.stack([a, c, d], 1)])
+
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(len(v))
+    rank = np.argsort(perm)
+    return v[perm], rank[f][rng.permutation(len(f))]
+
+
+def _face_set(v, f):
+    return set(tuple(sorted(map(tuple, tri))) for tri in v[f].tolist())
+
+
+class ReorderTestCase(unittest.TestCase):
+
+    def test_morton_codes(self):
+        p = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 1]], dtype=float)
+        codes = exporter.morton_codes(p)
+        self.assertEqual(codes.dtype, np.uint64)
+        self.assertEqual(codes[0], 0)
+        self.assertEqual(list(np.argsort(codes)), [0, 1, 2, 3, 4])
+        self.assertEqual(len(exporter.morton_codes(np.zeros((0, 3)))), 0)
+
+    def test_reorder_mesh_preserves_geometry(self):
+        v, f = _grid_mesh()
+        v2, f2 = exporter.reorder_mesh(v, f)
+        self.assertEqual(v2.shape, v.shape)
+        self.assertEqual(f2.shape, f.shape)
+        self.assertEqual(_face_set(v, f), _face_set(v2, f2))
+
+    def test_reorder_mesh_keeps_unreferenced_vertices(self):
+        v, f = _grid_mesh()
+        v = np.vstack([v, [[100.0, 100.0, 100.0]]])
+        v2, f2 = exporter.reorder_mesh(v, f)
+        self.assertTrue(np.array_equal(v2[-1], [100.0, 100.0, 100.0]))
+        self.assertEqual(f2.max(), len(v) - 2)
+
+    def test_writer_rejects_reorder_without_arrays(self):
+        with self.assertRaises(ValueError):
+            exporter.Writer(polydata=exporter.polygons2Polydata(*_grid_mesh(3)), reorder=True)
+
+
+class LODTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_parse_lod_face_counts(self):
+        self.assertEqual(exporter.parse_lod_face_counts(''), [])
+        self.assertEqual(exporter.parse_lod_face_counts('50, 200,, 50'), [200, 50])
+        with self.assertRaises(ValueError):
+            exporter.parse_lod_face_counts('100, a')
+        with self.assertRaises(ValueError):
+            exporter.parse_lod_face_counts('0')
+
+    def test_lod_filename(self):
+        self.assertEqual(exporter.lod_filename('out/mesh.stl', 2), 'out/mesh_lod2.stl')
+
+    def test_export_lods(self):
+        v, f = _grid_mesh()
+        filename = os.path.join(self._dir, 'mesh.stl')
+        exporter.export_polygon(v, f, 'stl', filename, lod_face_counts=[1000, 100, 40])
+        self.assertEqual(sorted(os.listdir(self._dir)), ['mesh.stl', 'mesh_lod1.stl', 'mesh_lod2.stl'])
+
+        w = exporter.Writer(v=v, f=f)
+        lod = exporter.decimate_polydata(w.getPolydata(), 40)
+        self.assertLess(lod.GetNumberOfPolys(), len(f))
+
+    def test_export_lods_shares_threads(self):
+        v, f = _grid_mesh()
+        piece_threads = []
+        write_partitioned = exporter.write_partitioned
+
+        def _write_partitioned(*args, **kwargs):
+            piece_threads.append(kwargs['threads'])
+            return write_partitioned(*args, **kwargs)
+
+        exporter.write_partitioned = _write_partitioned
+        try:
+            exporter.export_lods(exporter.arrays2Polydata(v, f), 'pvtp', os.path.join(self._dir, 'mesh.pvtp'),
+                                 [100, 50], pieces=4, threads=4)
+        finally:
+            exporter.write_partitioned = write_partitioned
+        self.assertEqual(piece_threads, [2, 2])
+
+
+class PartitionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_arrays_polydata_round_trip(self):
+        v, f = _grid_mesh()
+        v2, f2 = exporter.polydata2Arrays(exporter.arrays2Polydata(v, f, dtype=np.float64))
+        self.assertTrue(np.array_equal(v, v2))
+        self.assertTrue(np.array_equal(f, f2))
+
+    def test_partition_faces(self):
+        v, f = _grid_mesh()
+        pieces = exporter.partition_faces(v, f, 3)
+        self.assertEqual(len(pieces), 3)
+        self.assertTrue(np.array_equal(np.sort(np.concatenate(pieces)), np.arange(len(f))))
+
+    def test_pvtp_round_trip(self):
+        v, f = _grid_mesh()
+        filename = os.path.join(self._dir, 'mesh.pvtp')
+        exporter.export_polygon(v, f, 'pvtp', filename, pieces=4)
+        self.assertEqual(len(os.listdir(self._dir)), 5)
+
+        r = vtkXMLPPolyDataReader()
+        r.SetFileName(filename)
+        r.Update()
+        P = r.GetOutput()
+        self.assertEqual(P.GetNumberOfPolys(), len(f))
+
+        v2, f2 = exporter.polydata2Arrays(P)
+        global_ids = vtk_to_numpy(P.GetPointData().GetGlobalIds())
+        self.assertTrue(np.allclose(v2, v[global_ids]))
+        self.assertEqual(_face_set(v, f), _face_set(v2, f2))
+
+    def test_pvtp_removes_stale_pieces(self):
+        v, f = _grid_mesh()
+        filename = os.path.join(self._dir, 'mesh.pvtp')
+        exporter.export_polygon(v, f, 'pvtp', filename, pieces=4)
+        exporter.export_polygon(v, f, 'pvtp', filename, pieces=2)
+        self.assertEqual(sorted(os.listdir(self._dir)), ['mesh.pvtp', 'mesh_0.vtp', 'mesh_1.vtp'])
+
+
+class WriterOutputTestCase(unittest.TestCase):
+    """Files written from arrays must match those written through the
+    original polygons2Polydata path.
+    """
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _read(self, filename):
+        with open(filename, 'rb') as f:
+            return f.read()
+
+    def test_output_unchanged(self):
+        v, f = _grid_mesh()
+        for suffix in ('stl', 'ply', 'vtp'):
+            for ascenc in (True, False):
+                expected = os.path.join(self._dir, 'expected.' + suffix)
+                actual = os.path.join(self._dir, 'actual.' + suffix)
+                exporter.Writer(polydata=exporter.polygons2Polydata(v, f.tolist())).write(expected, ascenc=ascenc)
+                exporter.Writer(v=v, f=f).write(actual, ascenc=ascenc)
+                self.assertEqual(self._read(expected), self._read(actual), (suffix, ascenc))
+
+
+if __name__ == '__main__':
+    unittest.main()